@@ -7,211 +7,630 @@ combines results, summarizes entity types, and generates visualizations.
 # ## Imports
 
 # %%
+import functools
+import os
+import re
+from collections import Counter
+from collections.abc import Iterable, Iterator, Sequence
+from html import escape
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
 import pandas as pd
 import spacy
 from spacy import displacy
-from spacy.matcher import Matcher
+from spacy.displacy.render import DEFAULT_LABEL_COLORS
+from spacy.language import Language
+from spacy.matcher import PhraseMatcher
+from spacy.tokens import Doc
 
 # %% [markdown]
-# ## Main NER pipeline
-# TODO: Break down this pipeline into pure functions for testability and maintainability
-
+# ## Custom entity patterns
 
 # %%
-def perform_ner_analysis(
-    text: str, model_name: str = "en_core_web_sm"
-) -> dict[str, displacy.Doc | pd.DataFrame | str]:
+# Literal phrases per label, matched case-insensitively on the `LOWER` attribute
+Patterns = Sequence[tuple[str, Sequence[str]]]
+
+_CUSTOM_PATTERNS: Patterns = [
+    # Organizations
+    (
+        "ORG",
+        [
+            "who",
+            "world health organization",
+            "ihme",
+            "fao",
+            "unep",
+            "iea",
+            "nasa",
+            "health effects institute",
+        ],
+    ),
+    # Research concepts
+    (
+        "RESEARCH_CONCEPT",
+        [
+            "energy ladder",
+            "energy poverty",
+            "indoor air pollution",
+            "improved cook stoves",
+            "particulate matter",
+            "pm2.5",
+            "pm10",
+        ],
+    ),
+    # Energy sources
+    (
+        "ENERGY_SOURCE",
+        [
+            "biomass",
+            "fuelwood",
+            "charcoal",
+            "coal",
+            "liquefied petroleum gas",
+            "crop waste",
+            "dried dung",
+        ],
+    ),
+    # Health conditions
+    (
+        "HEALTH_CONDITION",
+        [
+            "pneumonia",
+            "copd",
+            "chronic obstructive pulmonary disease",
+            "lung cancer",
+            "cataracts",
+            "burns",
+            "stillbirths",
+        ],
+    ),
+    # Geographic regions
+    (
+        "GEOG",
+        [
+            "sub-saharan africa",
+            "africa",
+            "asia",
+            "latin america",
+            "kenya",
+            "china",
+            "india",
+            "rome",
+            "delhi",
+        ],
+    ),
+    # Measurements
+    ("MEASUREMENT", ["micrograms per cubic metre"]),
+]
+
+# Measurements written as numbers with units, scanned over the raw document text
+_MEASUREMENT_REGEXES = (
+    re.compile(r"\d+\s*µg/m3"),
+    re.compile(r"\d+\s*gigatons"),
+)
+_MEASUREMENT_SPANS_KEY = "measurement"
+
+
+@Language.component("measurement_ruler")
+def _measurement_ruler(doc: Doc) -> Doc:
     """
-    Perform complete Named Entity Recognition analysis on the provided text.
+    Store regex-matched measurements in `doc.spans[_MEASUREMENT_SPANS_KEY]`.
+
+    Scanning `doc.text` with precompiled regexes avoids running a regex per token
+    through the Matcher.
 
     Args:
-        text (str): The input text to analyze
+        doc (Doc): Document to annotate
 
     Returns:
-        dict: Results dictionary containing:
-            - doc: spaCy Doc object
-            - all_entities: DataFrame of all entities
-            - type_summary: DataFrame of entity type counts
-            - visualization_html: HTML string of entity visualization
+        Doc: The same document with measurement spans added
+    """
+    spans = []
+    for regex in _MEASUREMENT_REGEXES:
+        for match in regex.finditer(doc.text):
+            span = doc.char_span(
+                match.start(), match.end(), label="MEASUREMENT", alignment_mode="expand"
+            )
+            if span is not None:
+                spans.append(span)
+    doc.spans[_MEASUREMENT_SPANS_KEY] = sorted(spans, key=lambda span: span.start_char)
+    return doc
+
+
+# %% [markdown]
+# ## Cached pipeline and matcher
+
+# %%
+# Only entities and token text are consumed downstream, so skip the rest of the pipeline
+_DISABLED_PIPES = ["tagger", "parser", "attribute_ruler", "lemmatizer"]
+
+
+@functools.lru_cache(maxsize=4)
+def _load_nlp(model_name: str, use_gpu: bool = False) -> Language:
     """
+    Load a spaCy pipeline once per model name and reuse it across calls.
+
+    Components listed in `_DISABLED_PIPES` are disabled, since the custom patterns
+    only rely on the `LOWER` attribute, and the `measurement_ruler` is appended.
 
+    Args:
+        model_name (str): Name of the installed spaCy model
+        use_gpu (bool): Allocate the pipeline on the GPU; raises if none is available
+
+    Returns:
+        Language: The loaded spaCy pipeline
+    """
+    if use_gpu:
+        # Must run before loading so the model weights are allocated on the GPU
+        spacy.require_gpu()
     try:
-        # 1. Load model
-        nlp: displacy.Language = spacy.load(model_name)
+        nlp = spacy.load(model_name, disable=_DISABLED_PIPES)
     except OSError as e:
         raise ImportError(
             f"Model {model_name} not found. Install it with: python -m spacy download {model_name}"
         )
+    nlp.add_pipe("measurement_ruler")
+    return nlp
 
-    # 2. Process document
-    doc: displacy.Doc = nlp(text)
 
-    # 3. Extract standard entities
-    entities = []
+def _freeze_patterns(patterns: Patterns) -> tuple[tuple[str, tuple[str, ...]], ...]:
+    """
+    Convert patterns to nested tuples so they can key the matcher caches.
+
+    Args:
+        patterns (Patterns): Label and phrases pairs
+
+    Returns:
+        tuple: The same patterns as hashable nested tuples
+    """
+    return tuple((name, tuple(phrases)) for name, phrases in patterns)
+
+
+@functools.lru_cache(maxsize=4)
+def _get_matcher(
+    nlp: Language, patterns: tuple[tuple[str, tuple[str, ...]], ...]
+) -> PhraseMatcher:
+    """
+    Return a PhraseMatcher holding the custom patterns, built once per pipeline.
+
+    A PhraseMatcher needs a single hash lookup per token, unlike the more general
+    token-pattern Matcher.
+
+    Args:
+        nlp (Language): The spaCy pipeline whose vocab the matcher uses
+        patterns (tuple): Frozen label and phrases pairs, see `_freeze_patterns`
+
+    Returns:
+        PhraseMatcher: Matcher with all `patterns` added
+    """
+    matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+    for name, phrases in patterns:
+        matcher.add(name, [nlp.make_doc(phrase) for phrase in phrases])
+    return matcher
+
+
+@functools.lru_cache(maxsize=4)
+def _get_label_ids(
+    nlp: Language, patterns: tuple[tuple[str, tuple[str, ...]], ...]
+) -> dict[int, str]:
+    """
+    Map the hashes of all known entity labels to their strings, once per pipeline.
+
+    Args:
+        nlp (Language): The spaCy pipeline whose string store the labels live in
+        patterns (tuple): Frozen label and phrases pairs, see `_freeze_patterns`
+
+    Returns:
+        dict: Label string for each label hash of the NER component and custom patterns
+    """
+    labels = [*nlp.pipe_labels.get("ner", ()), *(name for name, _ in patterns)]
+    return {nlp.vocab.strings.add(label): label for label in labels}
+
+
+@functools.lru_cache(maxsize=256)
+def _explain(label: str) -> str | None:
+    """
+    Memoized `spacy.explain`, so each label is looked up once per process.
+
+    Args:
+        label (str): Entity label, e.g. `ORG`
+
+    Returns:
+        str | None: Description of the label, or None if spaCy has none
+    """
+    return spacy.explain(label)
+
+
+# %% [markdown]
+# ## Entity visualization
+
+# %%
+# Same page layout as `displacy.render(doc, style="ent", page=True)`, spliced as bytes
+_HTML_HEADER = (
+    b'<!DOCTYPE html>\n<html lang="en">\n<head>\n<title>displaCy</title>\n</head>\n'
+    b'<body style="font-size: 16px; font-family: -apple-system, BlinkMacSystemFont, '
+    b"'Segoe UI', Helvetica, Arial, sans-serif, 'Apple Color Emoji', 'Segoe UI Emoji', "
+    b"'Segoe UI Symbol'; padding: 4rem 2rem; direction: ltr\">\n"
+    b'<div class="entities" style="line-height: 2.5; direction: ltr; '
+    b'white-space: pre-wrap">'
+)
+_HTML_FOOTER = b"</div>\n</body>\n</html>\n"
+_MARK_OPEN = (
+    '<mark class="entity" style="background: {color}; padding: 0.45em 0.6em; '
+    'margin: 0 0.25em; line-height: 1; border-radius: 0.35em;">'
+)
+_MARK_CLOSE = (
+    '<span style="font-size: 0.8em; font-weight: bold; line-height: 1; '
+    'border-radius: 0.35em; vertical-align: middle; margin-left: 0.5rem">'
+    "{label}</span></mark>"
+)
+
+
+@functools.lru_cache(maxsize=256)
+def _mark_fragments(label: str) -> tuple[bytes, bytes]:
+    """
+    Encode the opening and closing `<mark>` fragments of a label once.
+
+    Args:
+        label (str): Entity label, e.g. `ORG`
+
+    Returns:
+        tuple: Opening and closing HTML fragments as UTF-8 bytes
+    """
+    color = DEFAULT_LABEL_COLORS.get(label, "#ddd")
+    return (
+        _MARK_OPEN.format(color=color).encode("utf-8"),
+        _MARK_CLOSE.format(label=escape(label)).encode("utf-8"),
+    )
+
+
+def _render_entity_html(doc: Doc) -> Iterator[bytes]:
+    """
+    Render the entity visualization page of a document as a stream of byte chunks.
+
+    The text between entities is copied verbatim (HTML-escaped) and each entity in
+    `doc.ents` is wrapped in its precomputed `<mark>` fragments.
+
+    Args:
+        doc (Doc): Document whose entities are visualized
+
+    Yields:
+        bytes: Consecutive chunks of the HTML page
+    """
+    text = doc.text
+    yield _HTML_HEADER
+    prev_end = 0
     for ent in doc.ents:
-        entities.append(
-            {
-                "Text": ent.text,
-                "Start": ent.start_char,
-                "End": ent.end_char,
-                "Type": ent.label_,
-                "Description": spacy.explain(ent.label_),
-            }
-        )
+        mark_open, mark_close = _mark_fragments(ent.label_)
+        yield escape(text[prev_end : ent.start_char]).encode("utf-8")
+        yield mark_open
+        yield escape(text[ent.start_char : ent.end_char]).encode("utf-8")
+        yield mark_close
+        prev_end = ent.end_char
+    yield escape(text[prev_end:]).encode("utf-8")
+    yield _HTML_FOOTER
 
-    # 4. Add custom entity patterns
-    matcher = Matcher(nlp.vocab)
-    custom_patterns = [
-        # Organizations
-        (
-            "ORG",
-            [
-                [{"LOWER": "who"}],
-                [{"LOWER": "world"}, {"LOWER": "health"}, {"LOWER": "organization"}],
-                [{"LOWER": "ihme"}],
-                [{"LOWER": "fao"}],
-                [{"LOWER": "unep"}],
-                [{"LOWER": "iea"}],
-                [{"LOWER": "nasa"}],
-                [{"LOWER": "health"}, {"LOWER": "effects"}, {"LOWER": "institute"}],
-            ],
-        ),
-        # Research concepts
-        (
-            "RESEARCH_CONCEPT",
-            [
-                [{"LOWER": "energy"}, {"LOWER": "ladder"}],
-                [{"LOWER": "energy"}, {"LOWER": "poverty"}],
-                [{"LOWER": "indoor"}, {"LOWER": "air"}, {"LOWER": "pollution"}],
-                [{"LOWER": "improved"}, {"LOWER": "cook"}, {"LOWER": "stoves"}],
-                [{"LOWER": "particulate"}, {"LOWER": "matter"}],
-                [{"LOWER": {"IN": ["pm2.5", "pm10"]}}],
-            ],
-        ),
-        # Energy sources
-        (
-            "ENERGY_SOURCE",
-            [
-                [{"LOWER": "biomass"}],
-                [{"LOWER": "fuelwood"}],
-                [{"LOWER": "charcoal"}],
-                [{"LOWER": "coal"}],
-                [{"LOWER": "liquefied"}, {"LOWER": "petroleum"}, {"LOWER": "gas"}],
-                [{"LOWER": "crop"}, {"LOWER": "waste"}],
-                [{"LOWER": "dried"}, {"LOWER": "dung"}],
-            ],
-        ),
-        # Health conditions
-        (
-            "HEALTH_CONDITION",
-            [
-                [{"LOWER": "pneumonia"}],
-                [{"LOWER": "copd"}],
-                [
-                    {"LOWER": "chronic"},
-                    {"LOWER": "obstructive"},
-                    {"LOWER": "pulmonary"},
-                    {"LOWER": "disease"},
-                ],
-                [{"LOWER": "lung"}, {"LOWER": "cancer"}],
-                [{"LOWER": "cataracts"}],
-                [{"LOWER": "burns"}],
-                [{"LOWER": "stillbirths"}],
-            ],
-        ),
-        # Geographic regions
-        (
-            "GEOG",
-            [
-                [{"LOWER": "sub-saharan"}, {"LOWER": "africa"}],
-                [{"LOWER": "africa"}],
-                [{"LOWER": "asia"}],
-                [{"LOWER": "latin"}, {"LOWER": "america"}],
-                [{"LOWER": "kenya"}],
-                [{"LOWER": "china"}],
-                [{"LOWER": "india"}],
-                [{"LOWER": "rome"}],
-                [{"LOWER": "delhi"}],
-            ],
-        ),
-        # Measurements
-        (
-            "MEASUREMENT",
-            [
-                [
-                    {"LOWER": "micrograms"},
-                    {"LOWER": "per"},
-                    {"LOWER": "cubic"},
-                    {"LOWER": "metre"},
-                ],
-                [{"TEXT": {"REGEX": "\\d+\\s*µg/m3"}}],
-                [{"TEXT": {"REGEX": "\\d+\\s*gigatons"}}],
-            ],
-        ),
+
+# %% [markdown]
+# ## Main NER pipeline
+# TODO: Break down this pipeline into pure functions for testability and maintainability
+
+
+# %%
+class NERResult(NamedTuple):
+    """
+    Results of a Named Entity Recognition analysis.
+
+    Attributes:
+        doc (Doc): spaCy Doc object
+        all_entities (pd.DataFrame): DataFrame of all entities
+        type_summary (pd.DataFrame): DataFrame of entity type counts
+        visualization_html (str | None): HTML string of entity visualization, None
+            unless rendering was requested
+    """
+
+    doc: Doc
+    all_entities: pd.DataFrame
+    type_summary: pd.DataFrame
+    visualization_html: str | None = None
+
+
+# Zero-width split point after each blank line, so chunks concatenate back to the text
+_PARAGRAPH_BREAK = re.compile(r"(?<=\n\n)")
+
+
+def _split_paragraphs(text: str) -> list[str]:
+    """
+    Split text into paragraph chunks that concatenate back to the original text.
+
+    Args:
+        text (str): The input text
+
+    Returns:
+        list[str]: Non-empty chunks, each keeping its trailing blank line
+    """
+    return [chunk for chunk in _PARAGRAPH_BREAK.split(text) if chunk]
+
+
+def _span_offsets(spans: Sequence[displacy.Span]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Collect the start and end character offsets of spans into int32 arrays.
+
+    Args:
+        spans (Sequence[Span]): Spans to read the offsets from
+
+    Returns:
+        tuple: Start and end character offsets
+    """
+    starts = np.fromiter((span.start_char for span in spans), np.int32, len(spans))
+    ends = np.fromiter((span.end_char for span in spans), np.int32, len(spans))
+    return starts, ends
+
+
+def _entities_frame(
+    doc: displacy.Doc,
+    custom_spans: Sequence[displacy.Span],
+    label_by_id: dict[int, str],
+) -> tuple[pd.DataFrame, Counter[str]]:
+    """
+    Merge standard and custom entities into a single DataFrame ordered by position.
+
+    Standard entity labels are read from `doc.to_array`, and all columns are built
+    from arrays. Both entity sources are already ordered by `start_char`, so each row
+    position follows from a `searchsorted` against the other source, with no
+    re-sorting. On equal start offsets, standard entities come first.
+
+    Args:
+        doc (Doc): Processed document whose `ents` are the standard entities
+        custom_spans (Sequence[Span]): Custom entities ordered by `start_char`
+        label_by_id (dict): Label string for each label hash; labels missing from it
+            are resolved through the vocab
+
+    Returns:
+        tuple: DataFrame with one row per entity (Text, Start, End, Type and
+            Description) and the number of entities per type
+    """
+    ent_starts, ent_ends = _span_offsets(doc.ents)
+    custom_starts, custom_ends = _span_offsets(custom_spans)
+    # Each entity starts with exactly one "B" (3) token, in document order
+    iob_types = doc.to_array(["ENT_IOB", "ENT_TYPE"])
+    ent_label_ids = iob_types[iob_types[:, 0] == 3, 1]
+    custom_label_ids = np.fromiter(
+        (span.label for span in custom_spans), np.uint64, len(custom_spans)
+    )
+
+    ent_rows = np.arange(len(ent_starts)) + np.searchsorted(
+        custom_starts, ent_starts, side="left"
+    )
+    custom_rows = np.arange(len(custom_starts)) + np.searchsorted(
+        ent_starts, custom_starts, side="right"
+    )
+
+    size = len(ent_starts) + len(custom_starts)
+    starts = np.empty(size, dtype=np.int32)
+    ends = np.empty(size, dtype=np.int32)
+    label_ids = np.empty(size, dtype=np.uint64)
+    starts[ent_rows], starts[custom_rows] = ent_starts, custom_starts
+    ends[ent_rows], ends[custom_rows] = ent_ends, custom_ends
+    label_ids[ent_rows], label_ids[custom_rows] = ent_label_ids, custom_label_ids
+
+    # Resolve each distinct label hash once; only model labels have explanations
+    unique_ids, first_rows, codes = np.unique(
+        label_ids, return_index=True, return_inverse=True
+    )
+    labels = [
+        label_by_id.get(label_id) or doc.vocab.strings[label_id]
+        for label_id in unique_ids.tolist()
     ]
+    explained = np.zeros(len(labels), dtype=bool)
+    explained[codes[ent_rows]] = True
+    descriptions = np.array(
+        [
+            _explain(label) if is_explained else None
+            for label, is_explained in zip(labels, explained.tolist())
+        ],
+        dtype=object,
+    )
+    entity_descriptions = descriptions[codes]
+    entity_descriptions[custom_rows] = "Custom entity"
+
+    text = doc.text
+    frame = pd.DataFrame(
+        {
+            "Text": [
+                text[start:end] for start, end in zip(starts.tolist(), ends.tolist())
+            ],
+            "Start": starts,
+            "End": ends,
+            "Type": pd.Categorical.from_codes(codes, categories=labels),
+            "Description": entity_descriptions,
+        },
+        copy=False,
+    )
+    # Insert labels in order of first appearance so ties keep document order
+    label_counts = np.bincount(codes, minlength=len(labels)).tolist()
+    counts = Counter(
+        {labels[code]: label_counts[code] for code in np.argsort(first_rows).tolist()}
+    )
+    return frame, counts
 
-    for name, patterns in custom_patterns:
-        matcher.add(name, patterns)
-
-    matches: list[displacy.Span] = matcher(doc)
-    custom_entities = []
-    for match_id, start, end in matches:
-        span = doc[start:end]
-        custom_entities.append(
-            {
-                "Text": span.text,
-                "Start": span.start_char,
-                "End": span.end_char,
-                "Type": nlp.vocab.strings[match_id],
-                "Description": "Custom entity",
-            }
-        )
+
+def _analyze_doc(
+    doc: displacy.Doc,
+    nlp: Language,
+    patterns: tuple[tuple[str, tuple[str, ...]], ...],
+    render_html: bool = True,
+) -> NERResult:
+    """
+    Extract, combine and summarize the entities of an already processed document.
+
+    Args:
+        doc (Doc): Document produced by `nlp`
+        nlp (Language): The spaCy pipeline that processed `doc`
+        patterns (tuple): Frozen custom patterns, see `_freeze_patterns`
+        render_html (bool): Include the HTML visualization in the results
+
+    Returns:
+        NERResult: Analysis results
+    """
+    # 3. Standard entities are read from `doc.ents` when combining below
+
+    # 4. Add custom entity patterns
+    matcher = _get_matcher(nlp, patterns)
+    custom_spans: list[displacy.Span] = sorted(
+        [*matcher(doc, as_spans=True), *doc.spans[_MEASUREMENT_SPANS_KEY]],
+        key=lambda span: span.start_char,
+    )
 
     # 5. Combine all entities
-    all_entities: pd.DataFrame = pd.concat(
-        [pd.DataFrame(entities), pd.DataFrame(custom_entities)]
-        if custom_entities
-        else [pd.DataFrame(entities)],
-        ignore_index=True,
-    ).sort_values("Start")
+    all_entities, counts = _entities_frame(
+        doc, custom_spans, _get_label_ids(nlp, patterns)
+    )
+    # Few distinct labels, so integer-coded categories are much smaller than strings
+    all_entities["Description"] = all_entities["Description"].astype("category")
 
     # 6. Summarize by entity type
-    type_summary: pd.DataFrame = all_entities["Type"].value_counts().reset_index()
-    type_summary.columns = ["Entity Type", "Count"]
+    type_summary = pd.DataFrame(counts.most_common(), columns=["Entity Type", "Count"])
 
     # 7. Generate visualization HTML
-    html: str = displacy.render(doc, style="ent", page=True)
+    html = b"".join(_render_entity_html(doc)).decode("utf-8") if render_html else None
+
+    return NERResult(doc, all_entities, type_summary, html)
 
-    return {
-        "doc": doc,
-        "all_entities": all_entities,
-        "type_summary": type_summary,
-        "visualization_html": html,
-    }
+
+def perform_ner_analysis(
+    text: str,
+    model_name: str = "en_core_web_sm",
+    use_gpu: bool = False,
+    render_html: bool = True,
+    n_process: int = 1,
+    patterns: Patterns | None = None,
+) -> NERResult:
+    """
+    Perform complete Named Entity Recognition analysis on the provided text.
+
+    The text is split into paragraphs that are processed with `nlp.pipe`, so a long
+    document can be spread over `n_process` worker processes. The processed chunks
+    are joined back into a single Doc whose character offsets match `text`.
+
+    Args:
+        text (str): The input text to analyze
+        model_name (str): Name of the installed spaCy model, e.g. `en_core_web_trf`
+            for higher accuracy on GPU
+        use_gpu (bool): Run the pipeline on the GPU
+        render_html (bool): Render the HTML visualization; disable it when the
+            visualization is written with `save_visualization` or not needed at all
+        n_process (int): Number of worker processes; must be 1 on GPU
+        patterns (Patterns | None): Custom label and phrases pairs; defaults to the
+            domain patterns in `_CUSTOM_PATTERNS`
+
+    Returns:
+        NERResult: Named tuple containing:
+            - doc: spaCy Doc object
+            - all_entities: DataFrame of all entities
+            - type_summary: DataFrame of entity type counts
+            - visualization_html: HTML string of entity visualization, None unless
+              `render_html` is true
+    """
+
+    if use_gpu and n_process != 1:
+        raise ValueError("n_process must be 1 when use_gpu is enabled")
+
+    # 1. Load model
+    nlp: displacy.Language = _load_nlp(model_name, use_gpu)
+
+    # 2. Process document
+    chunks = _split_paragraphs(text)
+    if len(chunks) > 1:
+        docs = list(nlp.pipe(chunks, batch_size=64, n_process=n_process))
+        doc: displacy.Doc = Doc.from_docs(docs, ensure_whitespace=False)
+    else:
+        doc = nlp(text)
+
+    frozen_patterns = _freeze_patterns(_CUSTOM_PATTERNS if patterns is None else patterns)
+    return _analyze_doc(doc, nlp, frozen_patterns, render_html)
+
+
+def perform_ner_analysis_batch(
+    texts: Iterable[str],
+    model_name: str = "en_core_web_sm",
+    *,
+    batch_size: int | None = None,
+    n_process: int = 1,
+    use_gpu: bool = False,
+    render_html: bool = False,
+    patterns: Patterns | None = None,
+) -> Iterator[NERResult]:
+    """
+    Perform Named Entity Recognition analysis on many texts using `nlp.pipe`.
+
+    Texts are processed in minibatches, which is considerably faster than calling
+    `perform_ner_analysis` in a loop. A `batch_size` of 50-100 is usually a good fit
+    on CPU, with `n_process` around `os.cpu_count() - 1`. On GPU keep `n_process=1`
+    and rely on larger batches to saturate the device instead.
+
+    Args:
+        texts (Iterable[str]): The input texts to analyze
+        model_name (str): Name of the installed spaCy model
+        batch_size (int | None): Number of texts buffered per minibatch; defaults to
+            256 on GPU and 64 on CPU
+        n_process (int): Number of worker processes; must be 1 on GPU
+        use_gpu (bool): Run the pipeline on the GPU
+        render_html (bool): Include the HTML visualization in each result
+        patterns (Patterns | None): Custom label and phrases pairs; defaults to the
+            domain patterns in `_CUSTOM_PATTERNS`
+
+    Yields:
+        NERResult: One result per text, in input order
+    """
+    if use_gpu and n_process != 1:
+        raise ValueError("n_process must be 1 when use_gpu is enabled")
+    if batch_size is None:
+        batch_size = 256 if use_gpu else 64
+
+    nlp = _load_nlp(model_name, use_gpu)
+    frozen_patterns = _freeze_patterns(_CUSTOM_PATTERNS if patterns is None else patterns)
+    for doc in nlp.pipe(texts, batch_size=batch_size, n_process=n_process):
+        yield _analyze_doc(doc, nlp, frozen_patterns, render_html)
+
+
+def save_visualization(doc: displacy.Doc, output_file: str | Path) -> None:
+    """
+    Stream the entity visualization of a document straight to an HTML file.
+
+    Args:
+        doc (Doc): Document whose entities are visualized
+        output_file (str | Path): Path of the HTML file to write
+    """
+    with Path(output_file).open("wb") as f:
+        f.writelines(_render_entity_html(doc))
 
 
 # %%
 if __name__ == "__main__":
     # Example usage with sample text
-    sample_text = open("texts/ourworldindata.md").read()
+    sample_text = Path("texts/ourworldindata.md").read_text(encoding="utf-8")
     # Run the analysis
-    results = perform_ner_analysis(sample_text)
+    results = perform_ner_analysis(
+        sample_text, render_html=False, n_process=max(1, (os.cpu_count() or 1) - 1)
+    )
 
     # Display results
     print(
-        f"Found {len(results['all_entities'])} entities of {len(results['type_summary'])} different types"
+        f"Found {len(results.all_entities)} entities of {len(results.type_summary)} different types"
     )
 
     # Show entity type distribution
     print("\nEntity types distribution:")
-    print(results["type_summary"])
+    print(results.type_summary)
 
     # Show all found entities
     print("\nEntities found (sorted by position):")
-    print(results["all_entities"][["Text", "Type", "Description"]])
+    print(results.all_entities[["Text", "Type", "Description"]])
 
     # Save visualization to HTML file
     output_file = "plots/ner_visualization.html"
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(results["visualization_html"])
+    save_visualization(results.doc, output_file)
     print(f"\nEntity visualization saved to {output_file}")